@@ -2,6 +2,7 @@ import re, sys, time, os
 import functools as fu
 import sublime, sublime_plugin
 from copy import copy
+from collections import deque
 
 from .lib.misc import *
 from .lib import kill_ring
@@ -17,16 +18,25 @@ repeatable_cmds = set(['move', 'left_delete', 'right_delete', 'undo', 'redo'])
 # REMIND: I think we can delete this.
 built_in_ensure_visible_cmds = set(['move', 'move_to'])
 
+# characters which start (or end, when moving backward) an s-expression
+sexpr_open_chars = frozenset("({[`'\"")
+sexpr_close_chars = frozenset(")}]`\"")
+
+# matches blank text up to the end of the line
+re_blank_to_eol = re.compile(r'[ \t]*$')
+
 class ViewWatcher(sublime_plugin.EventListener):
     def __init__(self, *args, **kwargs):
         super(ViewWatcher, self).__init__(*args, **kwargs)
-        self.pending_dedups = 0
+        self.dedup_generation = 0
 
     def on_close(self, view):
         ViewState.on_view_closed(view)
+        isearch.clear_info_for(view)
 
     def on_modified(self, view):
-        CmdUtil(view).toggle_active_mark_mode(False)
+        # CmdWatcher.on_modified touches the view, so there's no need to do it here as well
+        CmdUtil(view, ViewState.find_or_create(view)).toggle_active_mark_mode(False)
 
     def on_activated(self, view):
         update_pinned_status(view)
@@ -37,38 +47,41 @@ class ViewWatcher(sublime_plugin.EventListener):
             # stop the search if we activated a new view in this window
             info.done()
 
+    #
+    # The context keys we handle, each mapped to a function which returns the value of that key for
+    # the specified view.
+    #
+    context_values = {
+        "i_search_active": lambda view: isearch.info_for(view) is not None,
+        "sbp_has_active_mark": lambda view: CmdUtil(view).state.active_mark,
+        "sbp_has_visible_selection": lambda view: view.sel()[0].size() > 1,
+        "sbp_use_alt_bindings": lambda view: settings_helper.get("sbp_use_alt_bindings", view=view),
+        "sbp_use_super_bindings": lambda view: settings_helper.get("sbp_use_super_bindings", view=view),
+        "sbp_alt+digit_inserts": lambda view: (settings_helper.get("sbp_alt+digit_inserts", view=view) or
+                                               not settings_helper.get("sbp_use_alt_bindings", view=view)),
+        "sbp_has_prefix_argument": lambda view: CmdUtil(view).has_prefix_arg(),
+    }
+
     def on_query_context(self, view, key, operator, operand, match_all):
-        def test(a):
-            if operator == sublime.OP_EQUAL:
-                return a == operand
-            if operator == sublime.OP_NOT_EQUAL:
-                return a != operand
-            return False
+        get_value = self.context_values.get(key)
+        if get_value is None:
+            return True if key == "sbp_catchall" else None
 
-        if key == "i_search_active":
-            return test(isearch.info_for(view) is not None)
-        if key == "sbp_has_active_mark":
-            return test(CmdUtil(view).state.active_mark)
-        if key == "sbp_has_visible_selection":
-            return test(view.sel()[0].size() > 1)
-        if key == "sbp_use_alt_bindings":
-            return test(settings_helper.get("sbp_use_alt_bindings"))
-        if key == "sbp_use_super_bindings":
-            return test(settings_helper.get("sbp_use_super_bindings"))
-        if key == "sbp_alt+digit_inserts":
-            return test(settings_helper.get("sbp_alt+digit_inserts") or not settings_helper.get("sbp_use_alt_bindings"))
-        if key == 'sbp_has_prefix_argument':
-            return test(CmdUtil(view).has_prefix_arg())
-        if key == "sbp_catchall":
-            return True
+        value = get_value(view)
+        if operator == sublime.OP_EQUAL:
+            return value == operand
+        if operator == sublime.OP_NOT_EQUAL:
+            return value != operand
+        return False
 
     def on_post_save(self, view):
         # Schedule a dedup, but do not do it NOW because it seems to cause a crash if, say, we're
-        # saving all the buffers right now. So we schedule it for the future.
-        self.pending_dedups += 1
+        # saving all the buffers right now. So we schedule it for the future. Only the most recently
+        # scheduled dedup actually runs: earlier ones see the generation has moved on and do nothing.
+        self.dedup_generation += 1
+        generation = self.dedup_generation
         def doit():
-            self.pending_dedups -= 1
-            if self.pending_dedups == 0:
+            if self.dedup_generation == generation:
                 dedup_views(sublime.active_window())
         sublime.set_timeout(doit, 50)
 
@@ -85,6 +98,24 @@ class CmdWatcher(sublime_plugin.EventListener):
         super(CmdWatcher, self).__init__(*args, **kwargs)
         self.pinned_text = None
 
+        # (ViewState, CmdUtil) pairs by view id
+        self.view_states = dict()
+
+    #
+    # Returns the view state and a CmdUtil for the specified view, reusing the ones we made the last
+    # time we saw this view. This does not touch() the view state: callers that start a new command
+    # are responsible for that.
+    #
+    def get_state(self, view):
+        entry = self.view_states.get(view.id())
+        if entry is None:
+            vs = ViewState.find_or_create(view)
+            entry = self.view_states[view.id()] = (vs, CmdUtil(view, vs))
+        return entry
+
+    def on_close(self, view):
+        self.view_states.pop(view.id(), None)
+
     def on_post_window_command(self, window, cmd, args):
         # update_pinned_status(window.active_view())
         info = isearch.info_for(window)
@@ -106,16 +137,21 @@ class CmdWatcher(sublime_plugin.EventListener):
                 return ('sbp_inc_search_escape', {'next_cmd': cmd, 'next_args': args})
             return
 
-        vs = ViewState.get(view)
-
-        if args is None:
-            args = {}
+        vs = self.get_state(view)[0]
+        vs.touch()
 
         # first keep track of this_cmd and last_cmd (if command starts with "sbp_" it's handled
         # elsewhere)
         if not cmd.startswith("sbp_"):
             vs.this_cmd = cmd
 
+        # the common case: nothing to do unless there's a mouse drag, active mark or numeric argument
+        if not (vs.active_mark or vs.argument_supplied) and cmd != 'drag_select':
+            return None
+
+        if args is None:
+            args = {}
+
         #
         # Process events that create a selection. The hard part is making it work with the emacs
         # region.
@@ -159,8 +195,7 @@ class CmdWatcher(sublime_plugin.EventListener):
     # Post command processing: deal with active mark and resetting the numeric argument.
     #
     def on_post_text_command(self, view, cmd, args):
-        vs = ViewState.get(view)
-        util = CmdUtil(view)
+        vs, util = self.get_state(view)
         if vs.active_mark and vs.this_cmd != 'drag_select' and vs.last_cmd == 'drag_select':
             # if we just finished a mouse drag, make sure active mark mode is off
             if cmd != "context_menu":
@@ -182,11 +217,10 @@ class CmdWatcher(sublime_plugin.EventListener):
     # Process the selection if it was created from a drag_select (mouse dragging) command.
     #
     def on_selection_modified(self, view):
-        vs = ViewState.get(view)
+        vs, cm = self.get_state(view)
         selection = view.sel()
 
         if len(selection) == 1 and vs.this_cmd == 'drag_select':
-            cm = CmdUtil(view, vs);
             if vs.drag_count == 2:
                 # second event - enable active mark
                 region = view.sel()[0]
@@ -201,7 +235,9 @@ class CmdWatcher(sublime_plugin.EventListener):
     # At a minimum this is called when bytes are inserted into the buffer.
     #
     def on_modified(self, view):
-        ViewState.get(view).this_cmd = None
+        vs = self.get_state(view)[0]
+        vs.touch()
+        vs.this_cmd = None
 
 
 class WindowCmdWatcher(sublime_plugin.EventListener):
@@ -253,11 +289,45 @@ class SbpDoTimesCommand(SbpTextCommand):
         if cmd in ('redo', 'undo'):
             sublime.set_timeout(doit, 10)
         else:
-            doit()
+            if not self.do_all_at_once(util, cmd, _times, args):
+                doit()
             cursor = util.get_last_cursor()
             if not visible.contains(cursor.b):
                 util.ensure_visible(cursor, True)
 
+    #
+    # Performs character motion and right_delete _times times in a single step, rather than running
+    # the command over and over. Returns False if the command needs to be run the slow way. This
+    # doesn't handle left_delete because of its special handling of indentation and bracket pairs.
+    #
+    def do_all_at_once(self, util, cmd, times, args):
+        view = self.view
+        cursors = list(view.sel())
+        size = view.size()
+        if cmd == 'move' and args.get('by') == 'characters' and 'forward' in args and \
+                set(args) <= set(['by', 'forward', 'extend']):
+            extend = args.get('extend', False)
+            if not extend and not util.all_empty_regions(cursors):
+                # moving collapses the selection first
+                return False
+            delta = times if args['forward'] else -times
+            regions = []
+            for c in cursors:
+                b = max(0, min(size, c.b + delta))
+                regions.append(sublime.Region(c.a if extend else b, b))
+            util.set_selection(regions)
+            return True
+        elif cmd == 'right_delete' and not args and util.all_empty_regions(cursors):
+            regions = [sublime.Region(c.b, min(size, c.b + times)) for c in cursors]
+            for i, r in enumerate(regions[1:]):
+                if regions[i].end() > r.begin():
+                    # cursors would merge part way through
+                    return False
+            for r in reversed(regions):
+                view.erase(util.edit, r)
+            return True
+        return False
+
 class SbpShowScopeCommand(SbpTextCommand):
     def run_cmd(self, util, direction=1):
         point = util.get_point()
@@ -273,28 +343,6 @@ class SbpShowScopeCommand(SbpTextCommand):
 class SbpMoveWordCommand(SbpTextCommand):
     is_ensure_visible_cmd = True
 
-    def find_by_class_fallback(self, view, point, forward, classes, seperators):
-      if forward:
-        delta = 1
-        end_position = self.view.size()
-        if point > end_position:
-          point = end_position
-      else:
-        delta = -1
-        end_position = 0
-        if point < end_position:
-          point = end_position
-
-      while point != end_position:
-        if view.classify(point) & classes != 0:
-          return point
-        point += delta
-
-      return point
-
-    def find_by_class_native(self, view, point, forward, classes, separators):
-        return view.find_by_class(point, forward, classes, separators)
-
     def run_cmd(self, util, direction=1):
         view = self.view
 
@@ -305,28 +353,31 @@ class SbpMoveWordCommand(SbpTextCommand):
         forward = count > 0
         count = abs(count)
 
-        def call_find_by_class(point, classes, separators):
-          '''
-          This is a small wrapper that maps to the right find_by_class call
-          depending on the version of ST installed
-          '''
-          return self.find_by_class_native(view, point, forward, classes, separators)
+        # going forward we find the start of the next word and then its end, and vice versa
+        if forward:
+            to_word, past_word = sublime.CLASS_WORD_START, sublime.CLASS_WORD_END
+        else:
+            to_word, past_word = sublime.CLASS_WORD_END, sublime.CLASS_WORD_START
+        find = view.find_by_class
+        is_word_char = util.is_word_char
 
-        def move_word0(cursor, first=False):
+        def move_word0_first(cursor):
+            # the first move stays in the current word if we're in one
             point = cursor.b
-            if forward:
-                if not first or not util.is_word_char(point, True, separators):
-                    point = call_find_by_class(point, sublime.CLASS_WORD_START, separators)
-                point = call_find_by_class(point, sublime.CLASS_WORD_END, separators)
-            else:
-                if not first or not util.is_word_char(point, False, separators):
-                    point = call_find_by_class(point, sublime.CLASS_WORD_END, separators)
-                point = call_find_by_class(point, sublime.CLASS_WORD_START, separators)
+            if not is_word_char(point, forward, separators):
+                point = find(point, forward, to_word, separators)
+            point = find(point, forward, past_word, separators)
+            return sublime.Region(point, point)
 
+        def move_word0(cursor):
+            point = find(cursor.b, forward, to_word, separators)
+            point = find(point, forward, past_word, separators)
             return sublime.Region(point, point)
 
-        for c in range(count):
-            util.for_each_cursor(move_word0, first=(c == 0))
+        if count > 0:
+            util.for_each_cursor(move_word0_first)
+            for c in range(count - 1):
+                util.for_each_cursor(move_word0)
 
 #
 # Advance to the beginning (or end if going backward) word unless already positioned at a word
@@ -338,10 +389,7 @@ class SbpMoveBackToIndentation(SbpTextCommand):
         view = self.view
 
         def to_indentation(cursor):
-            start = cursor.begin()
-            while util.is_one_of(start, " \t"):
-                start += 1
-            return start
+            return util.skip_chars(cursor.begin(), True, " \t")
 
         util.run_command("move_to", {"to": "hardbol", "extend": False})
         util.for_each_cursor(to_indentation)
@@ -397,9 +445,7 @@ class SbpChangeCaseCommand(SbpTextCommand):
 
             # now the selection is at the "other end" and so we create regions out of all the
             # cursors
-            new_regions = []
-            for r, s in zip(regions, selection):
-                new_regions.append(r.cover(s))
+            new_regions = [r.cover(s) for r, s in zip(regions, list(selection))]
             selection.clear()
             selection.add_all(new_regions)
 
@@ -407,7 +453,8 @@ class SbpChangeCaseCommand(SbpTextCommand):
         if mode in ('upper', 'lower'):
             util.run_command(mode + "_case", {})
         elif mode == "title":
-            for r in selection:
+            # work from the end so that earlier regions are unaffected by any change in length
+            for r in reversed(list(selection)):
                 util.view.replace(util.edit, r, view.substr(r).title())
         elif mode in ("underscore", "camel"):
             fcn = self.underscore if mode == "underscore" else self.camel
@@ -462,35 +509,41 @@ class SbpMoveSexprCommand(SbpTextCommand):
         forward = count > 0
         count = abs(count)
 
+        # the characters we skip over are white space and separators, but not brackets or quotes
+        brackets = sexpr_open_chars if forward else sexpr_close_chars
+        skip = "".join(ch for ch in " \t\r\n" + separators if ch not in brackets)
+
         def advance(cursor, first):
             point = cursor.b
             if forward:
                 limit = view.size()
                 while point < limit:
+                    point = util.skip_chars(point, True, skip)
+                    if point == limit:
+                        break
                     if util.is_word_char(point, True, separators):
                         point = view.find_by_class(point, True, sublime.CLASS_WORD_END, separators)
                         break
-                    else:
-                        ch = view.substr(point)
-                        if ch in "({[`'\"":
-                            next_point = util.to_other_end(point, direction)
-                            if next_point is not None:
-                                point = next_point
-                                break
-                        point += 1
+                    # we're at a bracket or quote
+                    next_point = util.to_other_end(point, direction)
+                    if next_point is not None:
+                        point = next_point
+                        break
+                    point += 1
             else:
                 while point > 0:
+                    point = util.skip_chars(point, False, skip)
+                    if point == 0:
+                        break
                     if util.is_word_char(point, False, separators):
                         point = view.find_by_class(point, False, sublime.CLASS_WORD_START, separators)
                         break
-                    else:
-                        ch = view.substr(point - 1)
-                        if ch in ")}]`\"":
-                            next_point = util.to_other_end(point, direction)
-                            if next_point is not None:
-                                point = next_point
-                                break
-                        point -= 1
+                    # we're just after a bracket or quote
+                    next_point = util.to_other_end(point, direction)
+                    if next_point is not None:
+                        point = next_point
+                        break
+                    point -= 1
 
             cursor.a = cursor.b = point
             return cursor
@@ -513,20 +566,24 @@ class SbpMoveToParagraphCommand(SbpTextCommand):
             if not forward:
                 # Remove whitespace and new lines for moving forward and backward paragraphs
                 this_region_begin = max(0, cursor.begin() - 1)
-                while this_region_begin > 0 and view.substr(this_region_begin) in whitespace:
-                    this_region_begin -= 1
+                if this_region_begin > 0:
+                    this_region_begin = max(0, util.skip_chars(this_region_begin + 1, False, whitespace) - 1)
                 point = paragraph.expand_to_paragraph(view, this_region_begin).begin()
             else:
                 this_region_end = cursor.end()
                 limit = self.view.size() - 1
-                while this_region_end < limit and view.substr(this_region_end) in whitespace:
-                    this_region_end += 1
+                if this_region_end < limit:
+                    this_region_end = min(limit, util.skip_chars(this_region_end, True, whitespace))
                 point = paragraph.expand_to_paragraph(self.view, this_region_end).end()
 
             return sublime.Region(point)
 
         for c in range(count):
+            cursors = list(view.sel())
             util.for_each_cursor(advance)
+            if list(view.sel()) == cursors:
+                # we're stuck at the beginning or end of the buffer - no point repeating
+                break
 
         s = view.sel()
         util.ensure_visible(s[-1] if forward else s[0])
@@ -572,21 +629,18 @@ class MoveThenDeleteHelper():
             # OK - so now check to see how many collapse after we combine the beginning and end
             # points of each region. We do that by creating the selection object, which disallows
             # overlapping regions by collapsing them.
+            regions = [sublime.Region(old.begin(), new.end()) if old < new else sublime.Region(new.begin(), old.end())
+                       for old, new in zip(orig_cursors, new_cursors)]
             selection.clear()
-            for old,new in zip(orig_cursors, new_cursors):
-                if old < new:
-                    selection.add(sublime.Region(old.begin(), new.end()))
-                else:
-                    selection.add(sublime.Region(new.begin(), old.end()))
+            selection.add_all(regions)
 
             collapsed_regions = len(orig_cursors) - len(selection)
 
             # OK one final check to see if any regions will overlap each other after we perform the
-            # kill.
+            # kill. If nothing collapsed, regions is sorted and matches the selection.
             if collapsed_regions == 0:
-                cursors = list(selection)
-                for i, c in enumerate(cursors[1:]):
-                    if cursors[i].contains(c.begin()):
+                for i, r in enumerate(regions[1:]):
+                    if regions[i].contains(r.begin()):
                         collapsed_regions += 1
 
         if collapsed_regions != 0:
@@ -597,11 +651,10 @@ class MoveThenDeleteHelper():
             return
 
         # copy the text into the kill ring
-        regions = [view.substr(r) for r in view.sel()]
-        kill_ring.add(regions, forward=self.forward, join=self.last_was_kill_cmd)
+        kill_ring.add([view.substr(r) for r in regions], forward=self.forward, join=self.last_was_kill_cmd)
 
-        # erase the regions
-        for region in selection:
+        # erase the regions from the end so the earlier ones stay put
+        for region in reversed(regions):
             view.erase(util.edit, region)
 
 
@@ -696,8 +749,9 @@ class SbpShiftRegionCommand(SbpTextCommand):
                 # shift right
                 self.view.run_command("insert", {"characters": " " * cols})
             else:
-                for i in range(amount):
-                    self.view.run_command("right_delete")
+                # shift left by erasing the blanks in front of each cursor
+                for cursor in reversed(list(selection)):
+                    view.erase(util.edit, sublime.Region(cursor.b, cursor.b + amount))
 
             # restore the region
             util.restore_cursors("shift")
@@ -724,10 +778,12 @@ class SbpCenterViewCommand(SbpTextCommand):
     last_scroll_type = None
     last_visible_region = None
 
-    def rowdiff(self, start, end):
-        r1,c1 = self.view.rowcol(start)
-        r2,c2 = self.view.rowcol(end)
-        return r2 - r1
+    # rows of the beginning and end of last_visible_region, and of the beginning of last_sel
+    last_visible_rows = None
+    last_sel_row = None
+
+    def row(self, point):
+        return self.view.rowcol(point)[0]
 
     def run_cmd(self, util, center_only=False):
         view = self.view
@@ -746,6 +802,8 @@ class SbpCenterViewCommand(SbpTextCommand):
     def cycle_center_view(self, start):
         if start != SbpCenterViewCommand.last_sel:
             SbpCenterViewCommand.last_visible_region = None
+            SbpCenterViewCommand.last_visible_rows = None
+            SbpCenterViewCommand.last_sel_row = None
             SbpCenterViewCommand.last_scroll_type = SCROLL_TYPES.CENTER
             SbpCenterViewCommand.last_sel = start
             self.view.show_at_center(SbpCenterViewCommand.last_sel)
@@ -755,19 +813,21 @@ class SbpCenterViewCommand(SbpTextCommand):
 
         SbpCenterViewCommand.last_sel = start
         if SbpCenterViewCommand.last_visible_region == None:
-            SbpCenterViewCommand.last_visible_region = self.view.visible_region()
+            visible = SbpCenterViewCommand.last_visible_region = self.view.visible_region()
+            SbpCenterViewCommand.last_visible_rows = (self.row(visible.begin()), self.row(visible.end()))
+            SbpCenterViewCommand.last_sel_row = self.row(start.begin())
 
         # Now Scroll to position
+        top_row, bottom_row = SbpCenterViewCommand.last_visible_rows
+        sel_row = SbpCenterViewCommand.last_sel_row
         if SbpCenterViewCommand.last_scroll_type == SCROLL_TYPES.CENTER:
             self.view.show_at_center(SbpCenterViewCommand.last_sel)
         elif SbpCenterViewCommand.last_scroll_type == SCROLL_TYPES.TOP:
-            row,col = self.view.rowcol(SbpCenterViewCommand.last_visible_region.end())
-            diff = self.rowdiff(SbpCenterViewCommand.last_visible_region.begin(), SbpCenterViewCommand.last_sel.begin())
-            self.view.show(self.view.text_point(row + diff-2, 0), False)
+            diff = sel_row - top_row
+            self.view.show(self.view.text_point(bottom_row + diff-2, 0), False)
         elif SbpCenterViewCommand.last_scroll_type == SCROLL_TYPES.BOTTOM:
-            row, col = self.view.rowcol(SbpCenterViewCommand.last_visible_region.begin())
-            diff = self.rowdiff(SbpCenterViewCommand.last_sel.begin(), SbpCenterViewCommand.last_visible_region.end())
-            self.view.show(self.view.text_point(row - diff+2, 0), False)
+            diff = bottom_row - sel_row
+            self.view.show(self.view.text_point(top_row - diff+2, 0), False)
 
 class SbpSetMarkCommand(SbpTextCommand):
     def run_cmd(self, util):
@@ -791,9 +851,13 @@ class SbpSetMarkCommand(SbpTextCommand):
 
 class SbpCancelMarkCommand(SbpTextCommand):
     def run_cmd(self, util):
-        if util.state.active_mark:
+        state = util.state
+        if state.active_mark:
             util.toggle_active_mark_mode()
-        util.state.mark_ring.clear()
+        elif not state.mark_ring.has_visible_mark():
+            # nothing to cancel - don't bother touching the view's regions
+            return
+        state.mark_ring.clear()
 
 class SbpSwapPointAndMarkCommand(SbpTextCommand):
     def run_cmd(self, util, toggle_active_mark_mode=False):
@@ -843,11 +907,12 @@ class SbpOpenLineCommand(SbpTextCommand):
         view = self.view
         count = util.get_count()
         if count > 0:
-            for point in view.sel():
-                view.insert(util.edit, point.b, "\n" * count)
-            while count > 0:
-                view.run_command("move", {"by": "characters", "forward": False})
-                count -= 1
+            points = [cursor.b for cursor in view.sel()]
+            for point in reversed(points):
+                view.insert(util.edit, point, "\n" * count)
+
+            # leave each cursor in front of its new lines, allowing for the lines inserted before it
+            util.set_selection([sublime.Region(point + i * count) for i, point in enumerate(points)])
 
 class SbpKillRegionCommand(SbpTextCommand):
     is_kill_cmd = True
@@ -858,8 +923,7 @@ class SbpKillRegionCommand(SbpTextCommand):
             data = [view.substr(r) for r in regions]
             kill_ring.add(data, True, False)
             if not is_copy:
-                for r in reversed(regions):
-                    view.erase(util.edit, r)
+                util.erase_all(regions)
             else:
                 bytes = sum(len(d) for d in data)
                 util.set_status("Copied %d bytes in %d regions" % (bytes, len(data)))
@@ -969,6 +1033,11 @@ class SbpPaneCmdCommand(SbpWindowCommand):
             selection = new_view.sel()
             selection.clear()
             selection.add_all([r for r in view.sel()])
+
+            # the rest only moves the viewports around, so it doesn't need the main thread
+            sublime.set_timeout_async(setup_viewports, 0)
+
+        def setup_viewports():
             new_view.set_viewport_position(view.viewport_position(), False)
 
             point = util.get_point()
@@ -1078,9 +1147,9 @@ class SbpToggleViewPinnedCommand(SbpTextCommand):
 class SbpCloseCurrentViewCommand(SbpWindowCommand):
     def run_cmd(self, util, n_windows=10):
         window = sublime.active_window()
-        sorted = ViewState.sorted_views(window, window.active_group())
+        sorted = deque(ViewState.sorted_views(window, window.active_group()))
         if len(sorted) > 0:
-            view = sorted.pop(0)
+            view = sorted.popleft()
             window.focus_view(view)
             window.run_command('close')
             if len(sorted) > 0:
@@ -1104,24 +1173,24 @@ class SbpMoveForKillLineCommand(SbpTextCommand):
             text,index,region = util.get_line_info(start)
 
             if line_mode:
-                # go down N lines
-                for i in range(abs(count)):
-                    view.run_command("move", {"by": "lines", "forward": count > 0})
+                # go down (or up) N lines, stopping at the first or last line of the file
+                row = view.rowcol(start)[0]
+                if count > 0:
+                    target_row = min(row + count, view.rowcol(view.size())[0])
+                else:
+                    target_row = max(row + count, 0)
 
-                end = util.get_point()
-                if count != 0 and region.contains(end):
-                    # same line we started on - must be on the last line of the file
+                if count != 0 and target_row == row:
+                    # same line we started on - must be on the last (or first) line of the file
                     end = region.end() if count > 0 else region.begin()
                 else:
                     # beginning of the line we ended up on
-                    end = view.line(util.get_point()).begin()
-                    util.set_cursors(sublime.Region(end))
+                    end = view.text_point(target_row, 0)
             else:
                 end = region.end()
 
                 # check if line is blank from here to the end and if so, delete the \n as well
-                import re
-                if re.match(r'[ \t]*$', text[index:]) and end < util.view.size():
+                if re_blank_to_eol.match(text, index) and end < util.view.size():
                     end += 1
 
             return sublime.Region(end, end)
@@ -1156,8 +1225,9 @@ class SbpYankCommand(SbpTextCommand):
             # fetch updated cursors
             cursors = util.get_cursors()
 
-        for region, data in reversed(list(zip(cursors, data))):
-            view.replace(util.edit, region, data)
+        # replace back to front so earlier regions stay put
+        for i in range(min(len(cursors), len(data)) - 1, -1, -1):
+            view.replace(util.edit, cursors[i], data[i])
         util.state.mark_ring.set(util.get_cursors(begin=True), True)
         util.make_cursors_empty()
         util.ensure_visible(util.get_last_cursor())
@@ -1301,8 +1371,6 @@ class SbpTabCmdCommand(SbpTextCommand):
 #
 class SbpQuitCommand(SbpTextCommand):
     def run_cmd(self, util, favor_side="start"):
-        window = self.view.window()
-
         # get all the regions
         regions = list(self.view.sel())
         if not util.all_empty_regions(regions):
@@ -1319,13 +1387,14 @@ class SbpQuitCommand(SbpTextCommand):
             favor_start = favor_side == "start"
             favor_end = favor_side == "end"
 
-            start_visible = util.is_visible(start)
-            end_visible = util.is_visible(end)
+            # fetch the visible region once for all the checks below
+            visible = self.view.visible_region()
+            start_visible = visible.contains(start)
+            end_visible = visible.contains(end)
 
             pos = None
             if not (start_visible or end_visible):
                 # pick whichever side is closest
-                visible = self.view.visible_region()
                 if abs(visible.begin() - start) < abs(visible.end() - end):
                     pos = start
                 else:
@@ -1379,10 +1448,20 @@ class AskCharOrStringBase(SbpTextCommand):
         util = self.util
         self.window.run_command("hide_panel")
 
-        count = abs(self.count)
+        util.for_each_cursor(self.process_n, content, abs(self.count))
+
+    #
+    # Calls process_one count times in a row on one cursor. Returns the final position or None if
+    # any of them fail.
+    #
+    def process_n(self, cursor, content, count):
         for i in range(count):
             self.last_iteration = (i == count - 1)
-            util.for_each_cursor(self.process_one, content)
+            point = self.process_one(cursor, content)
+            if point is None:
+                return None
+            cursor = sublime.Region(point)
+        return cursor
 
     def on_done(self, content):
         if self.mode == "string":
@@ -1509,13 +1588,27 @@ class SbpTrimTrailingWhiteSpaceAndEnsureNewlineAtEofCommand(sublime_plugin.TextC
             if self.view.size() > 0 and self.view.substr(self.view.size() - 1) != '\n':
                 self.view.insert(edit, self.view.size(), "\n")
 
+#
+# Runs the above command before saving. We remember the view's change count (and the settings) after
+# doing so, and skip the whole thing if the view is saved again without any changes.
+#
 class SbpPreSaveWhiteSpaceHook(sublime_plugin.EventListener):
+    def __init__(self, *args, **kwargs):
+        super(SbpPreSaveWhiteSpaceHook, self).__init__(*args, **kwargs)
+        self.last_change_counts = dict()
+
     def on_pre_save(self, view):
-        trim = settings_helper.get("sbp_trim_trailing_white_space_on_save") == True
-        ensure = settings_helper.get("sbp_ensure_newline_at_eof_on_save") == True
+        trim = settings_helper.get("sbp_trim_trailing_white_space_on_save", view=view) == True
+        ensure = settings_helper.get("sbp_ensure_newline_at_eof_on_save", view=view) == True
         if trim or ensure:
+            if self.last_change_counts.get(view.id()) == (view.change_count(), trim, ensure):
+                return
             view.run_command("sbp_trim_trailing_white_space_and_ensure_newline_at_eof",
                              {"trim_whitespace": trim, "ensure_newline": ensure})
+            self.last_change_counts[view.id()] = (view.change_count(), trim, ensure)
+
+    def on_close(self, view):
+        self.last_change_counts.pop(view.id(), None)
 
 #
 # Function to dedup views in all the groups of the specified window. This does not close views that
@@ -1525,6 +1618,11 @@ class SbpPreSaveWhiteSpaceHook(sublime_plugin.EventListener):
 def dedup_views(window):
     # remember the current group so we can focus back to it when we're done
     group = window.active_group()
+
+    # First find all the views to close and the view to leave active in each group. This doesn't
+    # change the focus, so if there's nothing to close we're done without disturbing anything.
+    to_close = []
+    active_views = []
     for g in range(window.num_groups()):
         # get views for current group sorted by most recently used
         active = window.active_view_in_group(g)
@@ -1537,11 +1635,23 @@ def dedup_views(window):
             id = v.buffer_id()
             if id in view_by_buffer_id:
                 # already have a view with this buffer - so nuke this one - it's older
-                window.focus_view(v)
-                window.run_command('close')
+                to_close.append(v)
+                if v == active:
+                    # leave the newer view of the same buffer active instead
+                    active = view_by_buffer_id[id]
             else:
                  view_by_buffer_id[id] = v
-        window.focus_view(active)
+        active_views.append(active)
+
+    if not to_close:
+        return
+
+    for v in to_close:
+        window.focus_view(v)
+        window.run_command('close')
+    for active in active_views:
+        if active is not None:
+            window.focus_view(active)
     window.focus_group(group)
 
 def plugin_loaded():
@@ -27,6 +27,9 @@ isearch_current = 0
 # most recently accessed via up/down arrows
 isearch_index = 0
 
+# searches containing an upper case letter are case sensitive
+re_upper_case = re.compile(r'[A-Z]')
+
 def initialize():
     global isearch_history_settings, isearch_history, isearch_current, isearch_history_size
 
@@ -50,6 +53,9 @@ def initialize():
 
 isearch_info = dict()
 def info_for(view):
+    if not isearch_info:
+        # no searches in progress anywhere (the usual case)
+        return None
     if isinstance(view, sublime.Window):
         window = view
     else:
@@ -66,8 +72,12 @@ def set_info_for(view, info):
     isearch_info[window.id()] = info
     return info
 def clear_info_for(view):
-    window = view.window()
-    del(isearch_info[window.id()])
+    # Look the search up by its view rather than the view's window, because the view might have been
+    # closed already, in which case it no longer has a window.
+    view_id = view.id()
+    for key, info in list(isearch_info.items()):
+        if info.view.id() == view_id:
+            del(isearch_info[key])
 
 #
 # Save the search string to the ring buffer if it's different from the most recent entry.
@@ -195,7 +205,7 @@ class ISearchInfo():
     def find(self, val):
         # determine if this is case sensitive search or not
         flags = 0 if self.regex else sublime.LITERAL
-        if not re.search(r'[A-Z]', val):
+        if not re_upper_case.search(val):
             flags |= sublime.IGNORECASE
 
         # find all instances if we have a search string
@@ -399,7 +409,7 @@ class ISearchInfo():
         helper = self.util
         search = si.search
         separators = settings_helper.get("sbp_word_separators", default_sbp_word_separators)
-        case_sensitive = re.search(r'[A-Z]', search) is not None
+        case_sensitive = re_upper_case.search(search) is not None
 
         self.in_append_from_cursor = True
         self.append_group_id += 1
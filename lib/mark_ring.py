@@ -27,7 +27,8 @@ class MarkRing:
         self.view.erase_regions("jove_mark")
 
     def has_visible_mark(self):
-        return self.view.get_regions("jove_mark") != None and len(self.view.get_regions("jove_mark")) > 0
+        regions = self.view.get_regions("jove_mark")
+        return regions is not None and len(regions) > 0
 
     #
     # Update the display to show the current mark.
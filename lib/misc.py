@@ -1,4 +1,5 @@
 import os, re, time, traceback
+import functools as fu
 import sublime, sublime_plugin
 
 from .viewstate import *
@@ -14,6 +15,9 @@ settings_helper = None
 default_sbp_sexpr_separators = "./\\()\"'-:,.;<>~!@#$%^&*|+=[]{}`~?";
 default_sbp_word_separators = "./\\()\"'-_:,.;<>~!@#$%^&*|+=[]{}`~?";
 
+# number of characters we fetch at once when scanning the buffer
+SCAN_CHUNK_SIZE = 1024
+
 is_bracket_highlighter_installed = None
 
 def bracket_highlighter_installed():
@@ -71,6 +75,15 @@ def get_project_roots():
 # get_project_roots function, which sorts them appropriately for this function.
 #
 def get_relative_path(roots, file_name, n_components=2):
+    return cached_relative_path(tuple(roots) if roots is not None else None, file_name, n_components)
+
+#
+# Does the work for get_relative_path, which is called for every view each time we show the switch
+# to view panel or complete from all buffers. The result only depends on the arguments so we can
+# remember it.
+#
+@fu.lru_cache(maxsize=1024)
+def cached_relative_path(roots, file_name, n_components):
     if file_name is not None:
         if roots is not None:
             for root in roots:
@@ -83,23 +96,36 @@ def get_relative_path(roots, file_name, n_components=2):
         return "<no file>"
 
 #
-# A settings helper class which looks at the current view's settings and uses sublime settings as a
-# default value.
+# A settings helper class which looks at the current (or specified) view's settings and uses sublime
+# settings as a default value. Values from the sublime settings are cached until those settings
+# change.
 #
 class SettingsHelper:
     def __init__(self):
         self.global_settings = None
+        self.global_cache = dict()
 
-    def get(self, key, default = None):
-        if self.global_settings is None:
-            self.global_settings = sublime.load_settings('sublemacspro.sublime-settings')
-
-        settings = sublime.active_window().active_view().settings()
-        value = settings.get(key, None)
+    def get(self, key, default = None, view = None):
+        if view is None:
+            view = sublime.active_window().active_view()
+        value = view.settings().get(key, None)
         if value is None:
-            value = self.global_settings.get(key, default)
+            value = self.get_global(key, default)
         return value
 
+    #
+    # Like get() but ignores the current view's settings.
+    #
+    def get_global(self, key, default = None):
+        cache = self.global_cache
+        if key not in cache:
+            if self.global_settings is None:
+                self.global_settings = sublime.load_settings('sublemacspro.sublime-settings')
+                self.global_settings.add_on_change("sbp_settings_helper", cache.clear)
+            cache[key] = self.global_settings.get(key, None)
+        value = cache[key]
+        return default if value is None else value
+
 #
 # Called by all modules that define sublime editor commands.
 #
@@ -277,6 +303,20 @@ class CmdUtil:
             return regions
         self.set_status("Mark/Cursor mismatch: {} marks, {} cursors".format(len(marks), len(cursors)))
 
+    #
+    # Erases all the specified regions, from the end of the buffer towards the front. Regions which
+    # touch or overlap are erased together as a single region.
+    #
+    def erase_all(self, regions):
+        merged = []
+        for r in sorted(regions, key=lambda r: r.begin()):
+            if merged and merged[-1].end() >= r.begin():
+                merged[-1] = merged[-1].cover(r)
+            else:
+                merged.append(sublime.Region(r.begin(), r.end()))
+        for r in reversed(merged):
+            self.view.erase(self.edit, r)
+
     def get_encompassing_region(self):
         regions = self.get_regions()
         if regions:
@@ -538,6 +578,32 @@ class CmdUtil:
     def is_one_of(self, pos, chars):
         return self.view.substr(pos) in chars
 
+    #
+    # Skips over all the characters in chars starting at pos and returns the new position. When
+    # going backward the characters before pos are skipped. The buffer is read a chunk at a time
+    # rather than one character at a time.
+    #
+    def skip_chars(self, pos, forward, chars):
+        view = self.view
+        limit = view.size()
+        if forward:
+            while pos < limit:
+                chunk = view.substr(sublime.Region(pos, min(pos + SCAN_CHUNK_SIZE, limit)))
+                skipped = len(chunk) - len(chunk.lstrip(chars))
+                pos += skipped
+                if skipped < len(chunk):
+                    break
+        else:
+            # there's nothing past the end of the buffer to skip over
+            pos = min(pos, limit)
+            while pos > 0:
+                chunk = view.substr(sublime.Region(max(0, pos - SCAN_CHUNK_SIZE), pos))
+                skipped = len(chunk) - len(chunk.rstrip(chars))
+                pos -= skipped
+                if skipped < len(chunk):
+                    break
+        return pos
+
     #
     # Goes to the other end of the scope at the specified position. The specified position should be
     # around brackets or quotes.
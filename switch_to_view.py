@@ -21,6 +21,7 @@ class SbpSwitchToViewCommand(SbpTextCommand):
         self.roots = get_project_roots()
         self.original_view = window.active_view()
         self.highlight_count = 0
+        self.highlight_generation = 0
 
         # swap the top two views to enable switching back and forth like emacs
         if len(self.views) >= 2:
@@ -30,6 +31,8 @@ class SbpSwitchToViewCommand(SbpTextCommand):
         window.show_quick_panel(self.get_items(), self.on_select, 0, index, self.on_highlight)
 
     def on_select(self, index):
+        # cancel any pending preview
+        self.highlight_generation += 1
         if index >= 0:
             self.window.focus_view(self.views[index])
         else:
@@ -41,7 +44,14 @@ class SbpSwitchToViewCommand(SbpTextCommand):
         self.highlight_count += 1
         if self.highlight_count > 1:
             if self.group_views is None or self.views[index].id() in self.group_views:
-                self.window.focus_view(self.views[index])
+                # Preview after a short delay, and only if nothing else has been highlighted in the
+                # meantime, so we don't focus every view we pass when moving quickly through the list.
+                self.highlight_generation += 1
+                generation = self.highlight_generation
+                def doit():
+                    if self.highlight_generation == generation:
+                        self.window.focus_view(self.views[index])
+                sublime.set_timeout(doit, 30)
 
     def get_items(self):
         if self.display_components > 0:
@@ -22,13 +22,8 @@ class SbpDeleteWhiteSpaceCommand(SbpTextCommand):
         line = view.line(cursor.a)
         data = view.substr(line)
         row,col = view.rowcol(cursor.a)
-        start = col
-        while start - 1 >= 0 and data[start-1: start] in (" \t"):
-            start -= 1
-        end = col
-        limit = len(data)
-        while end < limit and data[end:end+1] in (" \t"):
-            end += 1
+        start = len(data[:col].rstrip(" \t"))
+        end = len(data) - len(data[col:].lstrip(" \t"))
 
         if end - start > keep_spaces:
             end -= keep_spaces